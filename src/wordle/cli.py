@@ -2,12 +2,13 @@ import concurrent.futures
 import io
 import os
 from datetime import datetime
-from string import ascii_lowercase
+from string import ascii_lowercase, ascii_uppercase
 from typing import List, Tuple
 
 import click
 
-from wordle.game import Knowledge, LetterFeedback, Result, get_result
+from wordle.game import Knowledge, LetterFeedback, Result, ResultPiece, get_result
+from wordle.precompute import WORD_LENGTH, pattern_matrix
 from wordle.wordle_words import (
     ALLOWED_GUESSES,
     SECRET_WORDS,
@@ -15,6 +16,10 @@ from wordle.wordle_words import (
     word_to_date,
 )
 
+# every word the game accepts as a guess, sorted once
+ALL_GUESSES = sorted(set(SECRET_WORDS + ALLOWED_GUESSES))
+_ALL_GUESSES_SET = frozenset(ALL_GUESSES)
+
 
 @click.group()
 @click.pass_context
@@ -28,10 +33,8 @@ class ResultType(click.ParamType):
     name = "result"
 
     def convert(self, value, param, ctx):
-        if isinstance(value, str):
-            return Result.from_str(value)
-        else:
-            raise ValueError(f"??? {value!r} {type(value)=}")
+        # click may hand back a value that has already been converted
+        return value if isinstance(value, Result) else Result.from_str(value)
 
 
 # Styles
@@ -41,18 +44,25 @@ WRONG_S = {"bg": "bright_black", "fg": "bright_white", **COMMON_S}
 WRONG_PLACE_S = {"bg": "bright_yellow", "fg": "black", **COMMON_S}
 
 
+FEEDBACK_S = {
+    LetterFeedback.wrong: WRONG_S,
+    LetterFeedback.wrong_place: WRONG_PLACE_S,
+    LetterFeedback.correct: CORRECT_S,
+}
+# styled letter for each (letter, feedback)
+_STYLED = {(c.lower(), fb): click.style(c, **style) for c in ascii_uppercase for fb, style in FEEDBACK_S.items()}
+
+
+def render_piece(piece: ResultPiece) -> str:
+    styled = _STYLED.get((piece.letter, piece.feedback))
+    if styled is None:
+        # not a lower case letter (e.g. a digit or upper case guess)
+        styled = click.style(piece.letter.upper(), **FEEDBACK_S[piece.feedback])
+    return styled
+
+
 def render_result(result: Result):
-    return "".join(
-        click.style(
-            piece.letter.upper(),
-            **{
-                LetterFeedback.wrong: WRONG_S,
-                LetterFeedback.wrong_place: WRONG_PLACE_S,
-                LetterFeedback.correct: CORRECT_S,
-            }[piece.feedback],
-        )
-        for piece in result
-    )
+    return "".join(render_piece(piece) for piece in result)
 
 
 def render_keyboard(k: Knowledge):
@@ -63,7 +73,7 @@ def render_keyboard(k: Knowledge):
     ):
         for c in row:
             if c in ascii_lowercase:
-                if c in k.answer:
+                if ord(c) in k.answer:
                     c = click.style(c, **CORRECT_S)
                 elif c in k.letter_min:
                     c = click.style(c, **WRONG_PLACE_S)
@@ -93,6 +103,10 @@ def valid_solutions_cmd(ctx: click.Context, quiet: bool, results: List[Result]):
         click.echo(p)
 
 
+# guesses scored together by one best-guess task
+_GUESS_BLOCK = 256
+
+
 @cli_main.command("best-guess")
 @click.option("--hard-mode", is_flag=True, default=False)
 @click.option("--only-secret-words", is_flag=True)
@@ -118,6 +132,9 @@ def best_guess_cmd(
     Find the guess word that would reduce the set of legal words the most.
     This is CPU intensive and by default uses all cores of the machine.
     """
+    for guess in guess_cli_strs:
+        if len(guess) != WORD_LENGTH or not all(c in ascii_lowercase for c in guess):
+            raise click.BadParameter(f"{guess} is not a {WORD_LENGTH} letter lower case word", param_hint="--guess")
     if not quiet:
         click.secho(f"{ctx.command.name}(", fg="white", bold=True)
         for r in results:
@@ -126,38 +143,38 @@ def best_guess_cmd(
     knowledge = Knowledge.from_results(*results)
     data = []
     valid_before = knowledge.valid_solutions()
+    if not valid_before:
+        raise click.ClickException("No valid solutions remain, the results contradict each other")
     if hard_mode:
         if only_secret_words:
-            guesses = sorted(knowledge.valid_solutions(word_list=SECRET_WORDS))
+            guesses = knowledge.valid_solutions(word_list=SECRET_WORDS)
         else:
-            guesses = sorted(knowledge.valid_solutions(word_list=set(SECRET_WORDS + ALLOWED_GUESSES)))
+            guesses = knowledge.valid_solutions(word_list=ALL_GUESSES)
     else:
         if only_secret_words:
-            guesses = sorted(SECRET_WORDS)
+            guesses = SECRET_WORDS
         else:
-            guesses = sorted(set(SECRET_WORDS + ALLOWED_GUESSES))
+            guesses = ALL_GUESSES
     if guess_cli_strs:
-        guesses = sorted(guess_cli_strs)
-    with concurrent.futures.ProcessPoolExecutor(max_workers=n_threads) as executor:
-        future_to_guess = {
-            executor.submit(knowledge.guess_reduction, guess, pretend_answers=pretend_answers): guess
-            for guess in guesses
-        }
+        guesses = list(guess_cli_strs)
+    elif not hard_mode:
+        # every guess is scored, build the feedback patterns for all of them once and the threads share them.
+        # Hard mode scores only the guesses still valid, their patterns are computed block by block
+        pattern_matrix()
+    blocks = [guesses[i : i + _GUESS_BLOCK] for i in range(0, len(guesses), _GUESS_BLOCK)]
+    # each block is a few large NumPy operations, the threads share the pattern matrix and knowledge
+    with concurrent.futures.ThreadPoolExecutor(max_workers=n_threads) as executor:
+        reductions = executor.map(lambda block: knowledge.guess_reductions(block, pretend_answers), blocks)
         with click.progressbar(
-            concurrent.futures.as_completed(future_to_guess),
-            item_show_func=lambda f: future_to_guess.get(f, ""),
-            show_pos=True,
             length=len(guesses),
+            item_show_func=lambda item: item or "",
+            show_pos=True,
         ) as pb:
-            for future in pb:
-                guess = future_to_guess[future]
-                try:
-                    reduction = future.result()
-                except Exception as exc:
-                    print("%r generated an exception: %s" % (guess, exc))
-                else:
-                    data.append((reduction, guess))
+            for block, block_reductions in zip(blocks, reductions):
+                data.extend(zip(block_reductions.tolist(), block))
+                pb.update(len(block), block[-1])
 
+    # the order guesses are scored in does not matter, this sort alone decides the output order
     data.sort()
     if not internal_call:
         for reduction, guess in data:
@@ -341,7 +358,7 @@ def play(ctx: click.Context, dt: datetime, hard_mode: bool, n_threads: int = os.
             continue
         if guess.lower() in ("quit", "exit"):
             break
-        if guess not in ALLOWED_GUESSES + SECRET_WORDS:
+        if guess not in _ALL_GUESSES_SET:
             click.secho(f"{guess} is not a valid guess word", fg="red", bold=True)
             continue
         if hard_mode and not knowledge.is_valid_solution(guess):
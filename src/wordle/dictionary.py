@@ -1,8 +1,19 @@
 import importlib.resources
 from pathlib import Path
+from typing import Set
 
-if (p := Path("/usr/share/dict/words")).exists():
-    with p.open("rt") as fin:
-        ALL_WORDS = set(fin.read().splitlines())
-else:
-    ALL_WORDS = set(importlib.resources.read_text(__package__, "words").splitlines())
+
+def _load() -> Set[str]:
+    if (p := Path("/usr/share/dict/words")).exists():
+        with p.open("rt") as fin:
+            return set(fin.read().splitlines())
+    return set(importlib.resources.read_text(__package__, "linux_words.txt").splitlines())
+
+
+def __getattr__(name: str):
+    # ALL_WORDS is only read from disk the first time it is used
+    if name == "ALL_WORDS":
+        global ALL_WORDS
+        ALL_WORDS = _load()
+        return ALL_WORDS
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
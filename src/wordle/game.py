@@ -1,14 +1,39 @@
-import copy
 from dataclasses import dataclass, field
 from enum import Enum, auto
-from functools import cached_property
+from functools import lru_cache
 from string import ascii_lowercase, ascii_uppercase
-from typing import Dict, List, Optional, Set, Union
-
+from typing import (
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+
+from wordle.precompute import (
+    ALPHABET_SIZE,
+    N_PATTERNS,
+    SECRET_INDEX,
+    WORD_COUNTS,
+    WORD_LENGTH,
+    WORD_POSITIONS,
+    WORD_PRESENCE,
+    compute_pattern_matrix,
+    encode_words,
+    guess_patterns,
+    is_encodable,
+    letter_counts,
+    letter_positions,
+    letter_presence,
+)
 from wordle.wordle_words import SECRET_WORDS
 
-WORD_LENGTH = 5
-
 
 class LetterFeedback(Enum):
     correct = auto()
@@ -16,8 +41,20 @@ class LetterFeedback(Enum):
     wrong_place = auto()
 
 
+# feedback of each base 3 digit of a pattern code
+CODE_FEEDBACK = (LetterFeedback.wrong, LetterFeedback.wrong_place, LetterFeedback.correct)
+# how each piece is written in the string representation of a result (see Result.from_str)
+_STR_FORMAT = {
+    LetterFeedback.correct: str.upper,
+    LetterFeedback.wrong: str,
+    LetterFeedback.wrong_place: "{}?".format,
+}
+
+
 @dataclass
 class ResultPiece:
+    # a Result holds one per letter, slots keep them small
+    __slots__ = ("letter", "feedback")
     letter: str
     feedback: Optional[LetterFeedback]
 
@@ -29,6 +66,19 @@ class Result:
     """
 
     pieces: List[ResultPiece]
+    # what the result tells about the answer, worked out once when the result is made
+    correct_letters: List[Tuple[int, str]] = field(init=False, repr=False, compare=False)
+    letter_mins: Dict[str, int] = field(init=False, repr=False, compare=False)
+    letter_maxes: Dict[str, int] = field(init=False, repr=False, compare=False)
+    wrong_positions: Dict[int, str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        (
+            self.correct_letters,
+            self.letter_mins,
+            self.letter_maxes,
+            self.wrong_positions,
+        ) = _constraints((piece.letter, piece.feedback) for piece in self.pieces)
 
     @classmethod
     def from_str(cls, result_str: str):
@@ -38,65 +88,21 @@ class Result:
         * Lower case: wrong letter (not in word)
         * Lower case followed by ?: letter is in word but at another position
         """
-        pieces: List[ResultPiece] = []
-        previous = None
-        for c in result_str:
-            if c in ascii_lowercase:
-                pieces.append(ResultPiece(c, LetterFeedback.wrong))
-            elif c in ascii_uppercase:
-                pieces.append(ResultPiece(c.lower(), LetterFeedback.correct))
-            elif c == "?":
-                if previous not in ascii_lowercase or pieces[-1].feedback != LetterFeedback.wrong:
-                    raise ValueError(f"Unexpected `?` found in {result_str}")
-                pieces[-1].feedback = LetterFeedback.wrong_place
-            previous = c
-        return cls(pieces)
+        return cls([ResultPiece(l, f) for l, f in _parse_result(result_str)])
+
+    @classmethod
+    def from_code(cls, guess: str, code: int):
+        """
+        Load a result from a guess and its pattern code (see wordle.precompute)
+        """
+        return cls([ResultPiece(l, CODE_FEEDBACK[code // 3**i % 3]) for i, l in enumerate(guess)])
 
     def __str__(self) -> str:
-        return "".join(
-            {
-                LetterFeedback.correct: piece.letter.upper(),
-                LetterFeedback.wrong: piece.letter,
-                LetterFeedback.wrong_place: piece.letter + "?",
-            }[piece.feedback]
-            for piece in self
-        )
+        return "".join(_STR_FORMAT[piece.feedback](piece.letter) for piece in self)
 
     def __iter__(self):
         return iter(self.pieces)
 
-    @cached_property
-    def correct_letters(self):
-        ret = []
-        for i, piece in enumerate(self):
-            if piece.feedback == LetterFeedback.correct:
-                ret.append((i, piece.letter))
-        return ret
-
-    @cached_property
-    def letter_mins(self) -> Dict[str, int]:
-        ret = {}
-        # just once for each letter
-        for letter in set(piece.letter for piece in self):
-            # find all occurrences of this letter that are not wrong
-            min_required = sum(1 for piece in self if piece.letter == letter and piece.feedback != LetterFeedback.wrong)
-            if min_required:
-                ret[letter] = min_required
-        return ret
-
-    @cached_property
-    def letter_maxes(self):
-        ret = {}
-        # just once for each wrong letter
-        for letter in set(piece.letter for piece in self if piece.feedback == LetterFeedback.wrong):
-            # The maximum is equal to the minimum
-            ret[letter] = self.letter_mins.get(letter, 0)
-        return ret
-
-    @cached_property
-    def wrong_positions(self):
-        return {i: r.letter for i, r in enumerate(self) if r.feedback == LetterFeedback.wrong_place}
-
 
 @dataclass
 class Knowledge:
@@ -114,10 +120,25 @@ class Knowledge:
     # Maximum occurrences of each letter (also handles wrong letters, max 0)
     letter_max: Dict[str, int] = field(default_factory=dict)
     wrong_positions: List[Set[str]] = field(default_factory=lambda: [set() for _ in range(WORD_LENGTH)])
-    answer: List = field(default_factory=lambda: [None] * WORD_LENGTH)
+    # known letter at each position as its character code, 0 while not known yet
+    answer: bytearray = field(default_factory=lambda: bytearray(WORD_LENGTH))
+
+    def __repr__(self) -> str:
+        # the answer is stored as character codes, show it as letters (None while not known yet)
+        answer = [chr(a) if a else None for a in self.answer]
+        return (
+            f"{type(self).__name__}(letter_min={self.letter_min!r}, letter_max={self.letter_max!r}, "
+            f"wrong_positions={self.wrong_positions!r}, answer={answer!r})"
+        )
 
-    def copy(self):
-        return copy.deepcopy(self)
+    def copy(self) -> "Knowledge":
+        # the containers only ever hold strings and ints so copying them one level deep is enough
+        return type(self)(
+            letter_min=dict(self.letter_min),
+            letter_max=dict(self.letter_max),
+            wrong_positions=[set(s) for s in self.wrong_positions],
+            answer=bytearray(self.answer),
+        )
 
     @classmethod
     def from_results(cls, *results: Union[Result, str]):
@@ -129,34 +150,61 @@ class Knowledge:
         return ret
 
     def is_valid_solution(self, word: str) -> bool:
-        # if it's not using all the correct letter counts it's wrong
-        for l, c in self.letter_min.items():
-            if word.count(l) < c:
-                return False
-        for l, c in self.letter_max.items():
-            if word.count(l) > c:
-                return False
+        # cheapest checks first, the letter counts have to scan the word for each letter
         # if the known positions are not correct it's false
         for a, l in zip(self.answer, word):
-            if a and a != l:
+            if a and a != ord(l):
                 return False
         # if a letter is in the wrong position it's wrong
         for i, l in enumerate(word):
             if l in self.wrong_positions[i]:
                 return False
+        # if it's not using all the correct letter counts it's wrong
+        for l, c in self.letter_min.items():
+            if word.count(l) < c:
+                return False
+        for l, c in self.letter_max.items():
+            if word.count(l) > c:
+                return False
         return True
 
-    def valid_solutions(self, word_list: List[str] = SECRET_WORDS) -> List[str]:
+    def _state_key(self) -> "StateKey":
+        """
+        Hashable snapshot of everything that constrains the valid solutions
+        """
+        return (
+            bytes(self.answer),
+            frozenset(self.letter_min.items()),
+            frozenset(self.letter_max.items()),
+            tuple(frozenset(s) for s in self.wrong_positions),
+        )
+
+    def secret_solution_indices(self) -> np.ndarray:
+        """
+        Indices into SECRET_WORDS of the valid solutions, cached by knowledge state
+        """
+        return _secret_solution_indices(self._state_key())
+
+    def valid_solutions(self, word_list: Iterable[str] = SECRET_WORDS) -> List[str]:
         # Should we limit this to list of secret words or also include anything
         # that wordle allows as a guess
-        return [w for w in word_list if self.is_valid_solution(w)]
+        if word_list is SECRET_WORDS:
+            return [SECRET_WORDS[i] for i in self.secret_solution_indices()]
+        word_list = list(word_list)
+        encodable = [w for w in word_list if is_encodable(w)]
+        chars = encode_words(encodable)
+        counts = letter_counts(chars)
+        mask = _solution_mask(self._state_key(), counts, letter_presence(counts), letter_positions(chars))
+        valid = {encodable[i] for i in np.flatnonzero(mask)}
+        # words that cannot be encoded are checked one at a time
+        return [w for w in word_list if (w in valid if is_encodable(w) else self.is_valid_solution(w))]
 
     def add_result(self, result: Result):
         # merge the correct letters
         for i, l in result.correct_letters:
             if self.answer[i]:
-                assert self.answer[i] == l
-            self.answer[i] = l
+                assert self.answer[i] == ord(l)
+            self.answer[i] = ord(l)
         # merge the min letter counts
         for l, c in result.letter_mins.items():
             # if we've established a max for this letter, make sure it's less than it
@@ -178,54 +226,192 @@ class Knowledge:
             self.wrong_positions[i].add(l)
 
     def guess_reduction(self, guess: str, pretend_answers: List[str] = None) -> float:
-        total = 0
-        # pretend each thing that can be correct is and gather average reduction valid solutions
-        if pretend_answers is None:
-            pretend_answers = self.valid_solutions()
-        for pretend_answer in pretend_answers:
-            k = self.copy()
-            k.add_result(get_result(answer=pretend_answer, guess=guess))
-            total += len(k.valid_solutions())
-        avg = total / len(pretend_answers)
-        return len(pretend_answers) - avg
+        return float(self.guess_reductions([guess], pretend_answers)[0])
+
+    def guess_reductions(self, guesses: Sequence[str], pretend_answers: List[str] = None) -> np.ndarray:
+        """
+        guess_reduction of every guess at once, as a few NumPy operations over the whole batch
+        Raises ValueError if there are no pretend answers (e.g. no valid solutions left)
+        """
+        pretend = None if pretend_answers is None else tuple(pretend_answers)
+        return _guess_reductions(self._state_key(), tuple(guesses), pretend)
 
 
-def get_result(*, answer: str, guess: str) -> Result:
+@lru_cache(maxsize=4096)
+def _parse_result(result_str: str) -> Tuple[Tuple[str, LetterFeedback], ...]:
+    # cached as immutable (letter, feedback) pairs, every Result gets its own pieces
+    pieces: List[ResultPiece] = []
+    previous = None
+    for c in result_str:
+        if c in ascii_lowercase:
+            pieces.append(ResultPiece(c, LetterFeedback.wrong))
+        elif c in ascii_uppercase:
+            pieces.append(ResultPiece(c.lower(), LetterFeedback.correct))
+        elif c == "?":
+            if previous not in ascii_lowercase or pieces[-1].feedback != LetterFeedback.wrong:
+                raise ValueError(f"Unexpected `?` found in {result_str}")
+            pieces[-1].feedback = LetterFeedback.wrong_place
+        previous = c
+    return tuple((piece.letter, piece.feedback) for piece in pieces)
+
+
+def _constraints(
+    pieces: Iterable[Tuple[str, LetterFeedback]]
+) -> Tuple[List[Tuple[int, str]], Dict[str, int], Dict[str, int], Dict[int, str]]:
     """
-    Given the answer the the guess string return a result
+    Given the (letter, feedback) of each position of a result return its
+    correct letters, letter minimums, letter maximums and wrong positions
     """
+    pieces = list(pieces)
+    correct_letters = []
+    letter_mins: Dict[str, int] = {}
+    for i, (l, feedback) in enumerate(pieces):
+        if feedback == LetterFeedback.correct:
+            correct_letters.append((i, l))
+        # every occurrence of a letter that is not wrong is required
+        if feedback != LetterFeedback.wrong:
+            letter_mins[l] = letter_mins.get(l, 0) + 1
+    letter_maxes = {}
+    wrong_positions = {}
+    for i, (l, feedback) in enumerate(pieces):
+        if feedback == LetterFeedback.wrong:
+            # The maximum is equal to the minimum
+            letter_maxes[l] = letter_mins.get(l, 0)
+        # a wrong letter that is also used elsewhere in the word (duplicates) is not at this position either
+        if feedback == LetterFeedback.wrong_place or (feedback == LetterFeedback.wrong and l in letter_mins):
+            wrong_positions[i] = l
+    return correct_letters, letter_mins, letter_maxes, wrong_positions
 
-    pieces: List[ResultPiece] = []
 
-    # Mark the obvious correct and wrong
-    for a, g in zip(answer, guess):
-        if g == a:
-            # if it's correct, it's always correct, don't need to look any deeper
-            pieces.append(ResultPiece(letter=g, feedback=LetterFeedback.correct))
-        elif g not in answer:
-            # if it's not in the word, it's always wrong, don't need to look any deeper
-            pieces.append(ResultPiece(letter=g, feedback=LetterFeedback.wrong))
-        else:
-            pieces.append(ResultPiece(letter=g, feedback=None))
-
-    # duplicates make things difficult, things can be marked as wrong or wrong position
-    for piece in pieces:
-        if piece.feedback is not None:
-            continue
-        # how many of this letter are in the answer
-        in_answer = answer.count(piece.letter)
-        # how many of this letter in this particular guess are already marked as correct or wrong place
-        already_marked = sum(
-            1
-            for p in pieces
-            if p.letter == piece.letter and p.feedback in (LetterFeedback.correct, LetterFeedback.wrong_place)
-        )
-        if in_answer > already_marked:
-            piece.feedback = LetterFeedback.wrong_place
+StateKey = Tuple[
+    bytes,
+    FrozenSet[Tuple[str, int]],
+    FrozenSet[Tuple[str, int]],
+    Tuple[FrozenSet[str], ...],
+]
+
+
+def _letter_index(l: str) -> Optional[int]:
+    """
+    Index of the letter in the encodings (see wordle.precompute), None if it is not a-z
+    """
+    i = ord(l) - ord("a")
+    return i if 0 <= i < ALPHABET_SIZE else None
+
+
+def _solution_mask(state: StateKey, counts: np.ndarray, presence: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    answer, letter_min, letter_max, wrong_positions = state
+    # encoded words only use a-z: no word has a required letter outside of it,
+    # and a letter outside of it never rules a word out
+    if any(_letter_index(l) is None for l, c in letter_min if c) or any(
+        a and _letter_index(chr(a)) is None for a in answer
+    ):
+        return np.zeros(len(counts), dtype=bool)
+    letter_min = [(l, c) for l, c in letter_min if _letter_index(l) is not None]
+    letter_max = [(l, c) for l, c in letter_max if _letter_index(l) is not None]
+    wrong_positions = [[l for l in letters if _letter_index(l) is not None] for letters in wrong_positions]
+    # cheap filter first: one AND per word for letters that must or must not be used at all
+    required = forbidden = 0
+    for l, c in letter_min:
+        required |= 1 << (ord(l) - ord("a"))
+    for l, c in letter_max:
+        if c == 0:
+            forbidden |= 1 << (ord(l) - ord("a"))
+    mask = ((presence & required) == required) & ((presence & forbidden) == 0)
+    # position constraints are a lookup of the words with that letter at that position
+    for i, a in enumerate(answer):
+        if a:
+            mask &= positions[i, a - ord("a")]
+    for i, letters in enumerate(wrong_positions):
+        for l in letters:
+            mask &= ~positions[i, ord(l) - ord("a")]
+    alive = np.flatnonzero(mask)
+    counts = counts[alive]
+
+    min_vec = np.zeros(ALPHABET_SIZE, dtype=np.uint8)
+    for l, c in letter_min:
+        min_vec[ord(l) - ord("a")] = c
+    # 255 means there is no known maximum
+    max_vec = np.full(ALPHABET_SIZE, 255, dtype=np.uint8)
+    for l, c in letter_max:
+        max_vec[ord(l) - ord("a")] = c
+    mask[alive] = (counts >= min_vec).all(1) & (counts <= max_vec).all(1)
+    return mask
+
+
+@lru_cache(maxsize=4096)
+def _secret_solution_indices(state: StateKey) -> np.ndarray:
+    """
+    Indices of the secret words that are valid solutions
+    """
+    mask = _solution_mask(state, WORD_COUNTS, WORD_PRESENCE, WORD_POSITIONS)
+    # only the indices are kept, later in a game they are much smaller than a mask over every secret word
+    indices = np.flatnonzero(mask).astype(np.uint16)
+    # shared by every caller with the same knowledge
+    indices.flags.writeable = False
+    return indices
+
+
+@lru_cache(maxsize=1024)
+def _guess_reductions(
+    state: StateKey, guesses: Tuple[str, ...], pretend_answers: Optional[Tuple[str, ...]]
+) -> np.ndarray:
+    # pretend each thing that can be correct is and gather average reduction valid solutions.
+    # The solutions left after a pretend answer are exactly the current valid solutions giving
+    # the same feedback for this guess, so the count left is the size of its feedback pattern bucket.
+    all_patterns = guess_patterns(guesses)
+    patterns = all_patterns[:, _secret_solution_indices(state)].astype(np.intp)
+    # give each guess its own range of buckets so one bincount counts them all
+    offsets = np.arange(len(guesses))[:, None] * N_PATTERNS
+    counts = np.bincount((patterns + offsets).ravel(), minlength=len(guesses) * N_PATTERNS)
+    counts = counts.reshape(len(guesses), N_PATTERNS)
+    if pretend_answers is None:
+        # every valid solution is a pretend answer, each one leaves its whole bucket
+        n = patterns.shape[1]
+        total = (counts * counts).sum(1)
+    else:
+        n = len(pretend_answers)
+        if all(a in SECRET_INDEX for a in pretend_answers):
+            # feedback against a secret word is already a column of the patterns
+            pretend_patterns = all_patterns[:, [SECRET_INDEX[a] for a in pretend_answers]]
         else:
-            piece.feedback = LetterFeedback.wrong
+            pretend_patterns = compute_pattern_matrix(encode_words(guesses), encode_words(pretend_answers))
+        total = np.take_along_axis(counts, pretend_patterns.astype(np.intp), 1).sum(1)
+    if n == 0:
+        raise ValueError("No pretend answers to average the reduction over")
+    avg = total / n
+    ret = n - avg
+    # shared by every caller asking about the same knowledge and guesses
+    ret.flags.writeable = False
+    return ret
+
+
+@lru_cache(maxsize=1 << 16)
+def feedback_code(answer: str, guess: str) -> int:
+    """
+    Given the answer and the guess string return the feedback as a pattern code (see wordle.precompute)
+    """
+    # letters of the answer that are not matched by the guess at the same position
+    remaining: Dict[str, int] = {}
+    for a, g in zip(answer, guess):
+        if a != g:
+            remaining[a] = remaining.get(a, 0) + 1
+    code = 0
+    for i, (a, g) in enumerate(zip(answer, guess)):
+        if a == g:
+            code += 2 * 3**i
+        elif remaining.get(g, 0):
+            # duplicates make things difficult, only as many as are left over get marked as wrong place
+            remaining[g] -= 1
+            code += 3**i
+    return code
+
 
-    return Result(pieces)
+def get_result(*, answer: str, guess: str) -> Result:
+    """
+    Given the answer the the guess string return a result
+    """
+    return Result.from_code(guess, feedback_code(answer, guess))
 
 
 class Game:
@@ -0,0 +1,127 @@
+"""
+NumPy encodings of word lists, computed once so constraint checks can run over whole lists at a time.
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+from wordle.wordle_words import ALLOWED_GUESSES, SECRET_WORDS
+
+WORD_LENGTH = 5
+ALPHABET_SIZE = 26
+
+
+def is_encodable(word: str) -> bool:
+    """
+    Whether the word can be encoded, i.e. is WORD_LENGTH lower case ASCII letters
+    """
+    return len(word) == WORD_LENGTH and all("a" <= c <= "z" for c in word)
+
+
+def encode_words(words: Sequence[str]) -> np.ndarray:
+    """
+    Encode words as an (N, WORD_LENGTH) uint8 array of letter indices (a=0 ... z=25).
+    Raises ValueError if any of the words is not encodable (see is_encodable).
+    """
+    for word in words:
+        if not is_encodable(word):
+            raise ValueError(f"Cannot encode {word!r}, need {WORD_LENGTH} lower case letters")
+    # all the letters of the list in one contiguous buffer
+    buf = np.frombuffer("".join(words).encode("ascii"), dtype=np.uint8)
+    return (buf - np.uint8(ord("a"))).reshape(len(words), WORD_LENGTH)
+
+
+def letter_counts(chars: np.ndarray) -> np.ndarray:
+    """
+    Given encoded words return an (N, ALPHABET_SIZE) uint8 array of how many times each letter is used
+    """
+    # give each word its own range of ALPHABET_SIZE bins so one bincount counts every word
+    bins = np.arange(len(chars))[:, None] * ALPHABET_SIZE + chars
+    counts = np.bincount(bins.ravel(), minlength=len(chars) * ALPHABET_SIZE)
+    return counts.reshape(len(chars), ALPHABET_SIZE).astype(np.uint8)
+
+
+def letter_presence(counts: np.ndarray) -> np.ndarray:
+    """
+    Given letter counts return an (N,) uint32 array with bit i set when letter i is used at all
+    """
+    return (counts > 0).astype(np.uint32) @ (np.uint32(1) << np.arange(ALPHABET_SIZE, dtype=np.uint32))
+
+
+def letter_positions(chars: np.ndarray) -> np.ndarray:
+    """
+    Given encoded words return a (WORD_LENGTH, ALPHABET_SIZE, N) bool array,
+    [i, l] is the mask of the words that have letter l at position i
+    """
+    return chars.T[:, None, :] == np.arange(ALPHABET_SIZE, dtype=np.uint8)[None, :, None]
+
+
+WORD_CHARS = encode_words(SECRET_WORDS)
+WORD_COUNTS = letter_counts(WORD_CHARS)
+WORD_PRESENCE = letter_presence(WORD_COUNTS)
+WORD_POSITIONS = letter_positions(WORD_CHARS)
+
+# base 3 digit i (3**i) is the feedback at position i: 0 wrong, 1 wrong place, 2 correct
+N_PATTERNS = 3**WORD_LENGTH
+# evaluate this many guesses at a time to bound the size of intermediate arrays
+_PATTERN_BLOCK = 256
+
+
+def compute_pattern_matrix(guesses: np.ndarray, answers: np.ndarray) -> np.ndarray:
+    """
+    Given encoded guesses and answers return a (G, A) uint8 array of feedback pattern codes.
+    Same algorithm as wordle.game.feedback_code, vectorized over every (guess, answer) pair.
+    """
+    ret = np.empty((len(guesses), len(answers)), dtype=np.uint8)
+    # position first so each position is one contiguous (G, A) plane
+    a = answers.T[:, None, :]
+    answer_counts = letter_counts(answers).T
+    for start in range(0, len(guesses), _PATTERN_BLOCK):
+        block = guesses[start : start + _PATTERN_BLOCK]
+        correct = block.T[:, :, None] == a
+        wrong_place = np.zeros_like(correct)
+        codes = np.zeros((len(block), len(answers)), dtype=np.uint8)
+        for j in range(WORD_LENGTH):
+            # how many of this letter are in the answer
+            available = answer_counts[block[:, j]]
+            for k in range(WORD_LENGTH):
+                # only guesses that use the same letter at k as at j
+                same = (block[:, k] == block[:, j])[:, None]
+                if not same.any():
+                    continue
+                # minus the ones marked correct
+                available -= correct[k] & same
+                # minus the ones already marked as wrong place earlier in the guess
+                if k < j:
+                    available -= wrong_place[k] & same
+            wrong_place[j] = ~correct[j] & (available > 0)
+            codes += correct[j] * np.uint8(2 * 3**j)
+            codes += wrong_place[j] * np.uint8(3**j)
+        ret[start : start + len(block)] = codes
+    return ret
+
+
+GUESS_INDEX = {w: i for i, w in enumerate(ALLOWED_GUESSES)}
+SECRET_INDEX = {w: i for i, w in enumerate(SECRET_WORDS)}
+_PATTERN_MATRIX = None
+
+
+def pattern_matrix() -> np.ndarray:
+    """
+    Feedback pattern codes of every allowed guess (rows) against every secret word (columns).
+    Built on first use and then kept for the life of the process.
+    """
+    global _PATTERN_MATRIX
+    if _PATTERN_MATRIX is None:
+        _PATTERN_MATRIX = compute_pattern_matrix(encode_words(ALLOWED_GUESSES), WORD_CHARS)
+    return _PATTERN_MATRIX
+
+
+def guess_patterns(guesses: Sequence[str]) -> np.ndarray:
+    """
+    Feedback pattern codes of each guess (rows) against every secret word (columns)
+    """
+    if _PATTERN_MATRIX is not None and all(g in GUESS_INDEX for g in guesses):
+        return _PATTERN_MATRIX[[GUESS_INDEX[g] for g in guesses]]
+    return compute_pattern_matrix(encode_words(guesses), WORD_CHARS)
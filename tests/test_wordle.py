@@ -1,8 +1,23 @@
 from datetime import date
 
+import pytest
+from click.testing import CliRunner
+
 from wordle import __version__
-from wordle.game import Knowledge, get_result
-from wordle.wordle_words import SECRET_WORDS, date_to_word, word_to_date
+from wordle.cli import cli_main
+from wordle.game import Knowledge, feedback_code, get_result
+from wordle.precompute import (
+    compute_pattern_matrix,
+    encode_words,
+    letter_counts,
+    letter_presence,
+)
+from wordle.wordle_words import (
+    ALLOWED_GUESSES,
+    SECRET_WORDS,
+    date_to_word,
+    word_to_date,
+)
 
 
 def test_version():
@@ -21,15 +36,15 @@ def test_knowledge():
     k = Knowledge()
     k.add_result(get_result(answer="abbey", guess="blobs"))
     assert k.letter_min == {"b": 2}
-    assert k.answer == [None, None, None, None, None]
+    assert k.answer == bytearray(5)
     assert k.letter_max == {"l": 0, "o": 0, "s": 0}
     k.add_result(get_result(answer="abbey", guess="blurb"))
     assert k.letter_min == {"b": 2}
-    assert k.answer == [None, None, None, None, None]
+    assert k.answer == bytearray(5)
     assert k.letter_max == {"l": 0, "o": 0, "s": 0, "u": 0, "r": 0}
     k.add_result(get_result(answer="abbey", guess="bobby"))
     assert k.letter_min == {"b": 2, "y": 1}
-    assert k.answer == [None, None, "b", None, "y"]
+    assert k.answer == bytearray(b"\0\0b\0y")
     assert k.letter_max == {"l": 0, "o": 0, "s": 0, "u": 0, "r": 0, "b": 2}
 
 
@@ -52,3 +67,142 @@ def test_some_bug_i_found():
     k.add_result(get_result(answer="order", guess="odder"))
     assert "odder" not in k.valid_solutions()
     assert "order" in k.valid_solutions()
+
+
+def test_valid_solutions_matches_is_valid_solution():
+    guess_words = ALLOWED_GUESSES[::100]
+    for n, answer in enumerate(SECRET_WORDS[::100]):
+        k = Knowledge()
+        for guess in ("arose", "until", guess_words[n]):
+            k.add_result(get_result(answer=answer, guess=guess))
+            assert k.valid_solutions() == [w for w in SECRET_WORDS if k.is_valid_solution(w)]
+            assert k.valid_solutions(word_list=guess_words) == [w for w in guess_words if k.is_valid_solution(w)]
+
+
+def test_guess_reduction():
+    def slow_guess_reduction(k, guess, pretend_answers):
+        total = 0
+        for pretend_answer in pretend_answers:
+            pretend = k.copy()
+            pretend.add_result(get_result(answer=pretend_answer, guess=guess))
+            total += len(pretend.valid_solutions())
+        return len(pretend_answers) - total / len(pretend_answers)
+
+    for results in (("blobs",), ("r?aIse",), ("b?lob?s",)):
+        k = Knowledge.from_results(*results)
+        for guess in ("eerie", "llama", "geese", "roate"):
+            valid = k.valid_solutions()
+            assert k.guess_reduction(guess) == pytest.approx(slow_guess_reduction(k, guess, valid))
+            assert k.guess_reduction(guess, valid[:1]) == pytest.approx(slow_guess_reduction(k, guess, valid[:1]))
+        guesses = ["eerie", "llama", "geese", "roate"]
+        assert list(k.guess_reductions(guesses)) == pytest.approx([k.guess_reduction(g) for g in guesses])
+        assert list(k.guess_reductions(guesses, valid[:3])) == pytest.approx(
+            [k.guess_reduction(g, valid[:3]) for g in guesses]
+        )
+
+    k = Knowledge.from_results("r?aIse", "cLInt")
+    assert k.valid_solutions() == []
+    with pytest.raises(ValueError):
+        k.guess_reductions(["roate"])
+    with pytest.raises(ValueError):
+        Knowledge().guess_reduction("roate", [])
+    result = CliRunner().invoke(cli_main, ["best-guess", "-q", "r?aIse", "cLInt"])
+    assert result.exit_code == 1
+    assert "No valid solutions" in result.output
+
+
+def test_pattern_matrix():
+    guesses = ALLOWED_GUESSES[::50] + ["bobby", "eerie", "llama"]
+    answers = SECRET_WORDS[::10] + ["abbey", "odder"]
+    patterns = compute_pattern_matrix(encode_words(guesses), encode_words(answers))
+    for i, guess in enumerate(guesses):
+        for j, answer in enumerate(answers):
+            assert patterns[i, j] == feedback_code(answer, guess)
+
+
+def test_solution_mask_cache():
+    k = Knowledge.from_results("r?aIse")
+    before = k.valid_solutions()
+    assert Knowledge.from_results("r?aIse").valid_solutions() == before
+    k.add_result(get_result(answer="point", guess="blobs"))
+    assert k.valid_solutions() == [w for w in SECRET_WORDS if k.is_valid_solution(w)]
+    assert Knowledge.from_results("r?aIse").valid_solutions() == before
+
+
+def test_knowledge_copy():
+    k = Knowledge.from_results("b?lob?s")
+    c = k.copy()
+    assert c == k
+    c.add_result(get_result(answer="abbey", guess="bobby"))
+    assert k == Knowledge.from_results("b?lob?s")
+    assert c != k
+
+
+def test_letter_presence():
+    words = ["abbey", "zesty", "odder"]
+    presence = letter_presence(letter_counts(encode_words(words)))
+    for word, bits in zip(words, presence):
+        assert bits == sum(1 << (ord(c) - ord("a")) for c in set(word))
+
+
+def test_best_guess_rejects_bad_guesses():
+    runner = CliRunner()
+    for guess in ("Roate", "abc", "poin1"):
+        result = runner.invoke(cli_main, ["best-guess", "-q", "-g", guess, "r?aIse"])
+        assert result.exit_code == 2
+        assert "--guess" in result.output
+
+
+def test_valid_solutions_unencodable_words():
+    k = Knowledge.from_results("r?aIse")
+    for word_list in (["rainy", "RAINY", "brink"], ["point", "ab"], ["brink", "brin1", "brink"]):
+        assert k.valid_solutions(word_list=word_list) == [w for w in word_list if k.is_valid_solution(w)]
+    with pytest.raises(ValueError):
+        encode_words(["point", "ab"])
+
+
+def test_wrong_duplicate_letter_position():
+    # the grey second "b" of bobby means there is no "b" at that position either
+    assert Knowledge.from_results("b?oBbY").wrong_positions[3] == {"b"}
+    assert get_result(answer="abbey", guess="bobby").wrong_positions == {0: "b", 3: "b"}
+
+
+def test_valid_solutions_match_feedback():
+    # after one result the valid solutions are exactly the words giving the same feedback,
+    # which is what bucketing by pattern code in guess_reduction relies on
+    pairs = list(zip(SECRET_WORDS[::37], ALLOWED_GUESSES[::211]))
+    pairs += [("abbey", "bobby"), ("odder", "order"), ("order", "odder"), ("point", "llama"), ("eerie", "geese")]
+    for answer, guess in pairs:
+        k = Knowledge()
+        k.add_result(get_result(answer=answer, guess=guess))
+        code = feedback_code(answer, guess)
+        assert k.valid_solutions() == [w for w in SECRET_WORDS if feedback_code(w, guess) == code]
+
+
+def test_get_result_cmd_renders_any_letter():
+    runner = CliRunner()
+    for guess in ("poin1", "title"):
+        result = runner.invoke(cli_main, ["get-result", "point", guess])
+        assert result.exit_code == 0
+        assert result.output == guess.upper() + "\n"
+
+
+def test_knowledge_repr():
+    k = Knowledge()
+    k.add_result(get_result(answer="abbey", guess="bobby"))
+    assert "answer=[None, None, 'b', None, 'y']" in repr(k)
+    assert str(k) == repr(k)
+
+
+def test_valid_solutions_unencodable_letters():
+    # letters outside a-z can end up in the knowledge from guesses typed on the command line
+    word_list = ["point", "poin1", "poinT", "roate", "brink"]
+    for guess in ("ROATE", "poinT", "poin1"):
+        k = Knowledge()
+        k.add_result(get_result(answer="point", guess=guess))
+        assert k.valid_solutions() == [w for w in SECRET_WORDS if k.is_valid_solution(w)]
+        assert k.valid_solutions(word_list=word_list) == [w for w in word_list if k.is_valid_solution(w)]
+    k = Knowledge()
+    k.add_result(get_result(answer="poinT", guess="poinT"))
+    assert k.valid_solutions() == []
+    assert k.valid_solutions(word_list=word_list) == ["poinT"]